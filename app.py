@@ -18,20 +18,26 @@ print(f"[flask] SECRET from env? {'yes' if env_secret else 'no (using hard)'}")
 
 from utils.openai_gpt import get_gpt_response
 from utils.twilio_response import create_twiml_response
+from utils.prompt_compiler import PromptCompiler, CallStep, FULL, TOKENS_ESTIMATED
 
-# --- Load external system prompt ---
+# --- Load external system prompt (compiled per dialog state, hot-reload) ---
 PROMPT_FILE = os.path.join(os.path.dirname(__file__), "prompts/system_prompt_en.txt")
-SYSTEM_PROMPT = ""
-if os.path.exists(PROMPT_FILE):
-    with open(PROMPT_FILE, "r", encoding="utf-8") as f:
-        SYSTEM_PROMPT = f.read().strip()
-    print("[app] system prompt loaded ✅")
-else:
-    print("[app] system prompt not found ❌")
+# При debug=True Werkzeug импортирует модуль дважды: компилируем и следим
+# за файлом только в обслуживающем процессе (или под gunicorn).
+_SERVING = __name__ != "__main__" or os.environ.get("WERKZEUG_RUN_MAIN") == "true"
+PROMPTS = PromptCompiler(
+    PROMPT_FILE,
+    reload_interval=float(os.environ.get("PROMPT_RELOAD_SECONDS", "2")),
+    autoload=_SERVING,
+)
+if _SERVING:
+    PROMPTS.start_watcher()
 
 # ---- Per-call chat history (in-memory) ----
 # CallSid -> deque of {'role': 'user'|'assistant', 'content': '...'}
 SESSIONS = defaultdict(lambda: deque(maxlen=12))
+# CallSid -> текущий шаг сценария (для выбора промпта)
+STEPS = defaultdict(CallStep)
 
 @app.route("/", methods=["GET"])
 def home():
@@ -58,6 +64,7 @@ def twilio_voice():
         # Очистим историю на старте звонка (подстраховка)
         if call_sid:
             SESSIONS.pop(call_sid, None)
+            STEPS.pop(call_sid, None)
         twiml_xml = create_twiml_response(None, first=True)
         return Response(twiml_xml, mimetype="text/xml")
 
@@ -67,8 +74,12 @@ def twilio_voice():
     if call_sid:
         SESSIONS[call_sid].append({"role": "user", "content": speech_text})
 
+    # Промпт только для текущего шага (из памяти, без чтения файла)
+    state = STEPS[call_sid].advance(speech_text, PROMPTS.compiled.order) if call_sid else FULL
+    print(f"[prompt] state={state}")
+
     # Получаем ответ GPT с учётом истории
-    out = get_gpt_response(speech_text, system_prompt=SYSTEM_PROMPT, history=hist)
+    out = get_gpt_response(speech_text, system_prompt=PROMPTS.get(state), history=hist)
 
     # Кладём ответ ассистента в историю
     if call_sid and out:
@@ -82,8 +93,20 @@ def twilio_voice():
 @app.route("/debug/clear/<sid>")
 def debug_clear(sid: str):
     SESSIONS.pop(sid, None)
+    STEPS.pop(sid, None)
     return f"Cleared session for {sid}", 200
 
+# --- Token savings of the compiled prompt per dialog state
+@app.route("/debug/prompt-stats")
+def debug_prompt_stats():
+    c = PROMPTS.compiled
+    return {
+        "full_tokens": c.tokens.get(FULL, 0),
+        "estimated": TOKENS_ESTIMATED,
+        "order": list(c.order),
+        "states": c.savings(),
+    }, 200
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port, debug=True)
@@ -0,0 +1,175 @@
+import os
+import time
+
+from utils.prompt_compiler import EXPECTED_STATES, FULL, CallStep, PromptCompiler, compile_prompt
+
+PROMPT_FILE = os.path.join(os.path.dirname(__file__), "..", "prompts", "system_prompt_en.txt")
+
+
+def _shipped_prompt() -> str:
+    with open(PROMPT_FILE, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _compiled():
+    return compile_prompt(_shipped_prompt())
+
+
+def _run_call(patient_turns, compiled=None):
+    """Возвращает шаг для каждой реплики пациента."""
+    c = compiled or _compiled()
+    step = CallStep()
+    return [step.advance(text, c.order) for text in patient_turns]
+
+
+FINAL_CONFIRMATION = "You are booked for"
+
+
+# ------------------------------- compile_prompt -------------------------------
+
+def test_shipped_prompt_has_every_flow_state():
+    c = _compiled()
+    assert c.order == EXPECTED_STATES
+    assert set(c.prompts) == {FULL, *EXPECTED_STATES}
+    assert "greeting" not in c.savings()
+
+
+def test_step_prompt_drops_only_completed_steps():
+    p = _compiled().prompts["when"]
+    assert "### General Rules" in p and "### Error Handling" in p
+    assert "What day and time do you prefer" in p
+    for later in ("Please tell me your date of birth.", "best phone number", FINAL_CONFIRMATION):
+        assert later in p
+    assert "Reason for Visit" not in p and "Full Name" not in p
+
+
+def test_every_step_prompt_has_final_confirmation():
+    c = _compiled()
+    for state in c.order:
+        assert FINAL_CONFIRMATION in c.prompts[state]
+
+
+def test_step_order_follows_the_file():
+    text = _shipped_prompt().replace("6. **Phone Number**", "6. **Insurance**\n   - Ask for insurance.\n\n7. **Phone Number**")
+    c = compile_prompt(text)
+    assert c.order == ("name", "reason", "when", "dob", "insurance", "phone", "confirm")
+    assert "Ask for insurance" not in c.prompts["phone"]
+
+    step = CallStep(state="dob", answered=True)
+    assert step.advance("yes", c.order) == "insurance"
+    step.advance("Blue Cross", c.order)
+    assert step.advance("yes", c.order) == "phone"
+
+
+def test_missing_step_falls_back_to_full(capsys):
+    text = _shipped_prompt().replace("5. **Date of Birth**", "5. **Something Else**")
+    c = compile_prompt(text)
+    assert "dob" not in c.prompts
+    assert "dob" in capsys.readouterr().err
+
+
+def test_savings_are_positive():
+    for s in _compiled().savings().values():
+        assert s["saved"] > 0
+
+
+# --------------------------------- CallStep ---------------------------------
+
+def test_call_with_every_step_confirmed_reaches_confirm():
+    states = _run_call([
+        "John Smith", "Yes",
+        "A checkup", "Yes, correct",
+        "Tomorrow at 3 pm", "yes",
+        "May 15 1980", "yeah",
+        "718 555 1234", "That's right",
+    ])
+    assert states == ["name", "reason", "reason", "when", "when", "dob", "dob", "phone", "phone", "confirm"]
+
+
+def test_patient_never_confirms_still_sees_final_confirmation():
+    c = _compiled()
+    turns = ["mumble", "mumble again", "a checkup", "tomorrow at three", "May 15 1980", "718 555 1234", "that is all"]
+    for state in _run_call(turns):
+        assert state == "name"
+        assert FINAL_CONFIRMATION in c.prompts[state]
+        assert "best phone number" in c.prompts[state]
+
+
+def test_lagging_step_keeps_later_steps_in_prompt():
+    c = _compiled()
+    turns = ["mumble", "mumble again", "a checkup", "tomorrow at three", "yes",
+             "May 15 1980", "yes", "718 555 1234", "yes"]
+    for state in _run_call(turns):
+        assert FINAL_CONFIRMATION in c.prompts[state]
+        assert "best phone number" in c.prompts[state]
+
+
+def test_volunteered_answer_keeps_later_steps_in_prompt():
+    c = _compiled()
+    states = _run_call(["John Smith", "Yes, and I need a checkup", "tomorrow at 3 pm"])
+    assert states == ["name", "reason", "reason"]
+    assert "What day and time do you prefer" in c.prompts[states[-1]]
+
+
+def test_phone_confirmation_phrasing_does_not_jump_to_confirm():
+    order = _compiled().order
+    step = CallStep(state="phone")
+    assert step.advance("718 555 1234", order) == "phone"
+    assert step.advance("No, it's 718 555 1243", order) == "phone"
+    assert step.advance("yes", order) == "confirm"
+
+
+def test_first_answer_on_step_never_advances():
+    step = CallStep(state="reason")
+    assert step.advance("Yes, I have a toothache", _compiled().order) == "reason"
+
+
+def test_repeats_do_not_restart_the_call():
+    step = CallStep(state="dob")
+    for _ in range(10):
+        assert step.advance("sorry what", _compiled().order) == "dob"
+
+
+def test_confirm_is_final():
+    step = CallStep(state="confirm", answered=True)
+    assert step.advance("yes", _compiled().order) == "confirm"
+
+
+def test_step_removed_by_reload_uses_full_prompt():
+    step = CallStep(state="insurance", answered=True)
+    assert step.advance("yes", _compiled().order) == FULL
+
+
+# -------------------------------- hot reload --------------------------------
+
+def test_hot_reload_picks_up_changes(tmp_path):
+    path = tmp_path / "prompt.txt"
+    path.write_text(_shipped_prompt(), encoding="utf-8")
+    pc = PromptCompiler(str(path), reload_interval=0.05)
+    pc.start_watcher()
+    assert "Be extra brief." not in pc.get("dob")
+
+    path.write_text(_shipped_prompt().replace("### General Rules:", "### General Rules:\n- Be extra brief."), encoding="utf-8")
+    deadline = time.time() + 3
+    while "Be extra brief." not in pc.get("dob") and time.time() < deadline:
+        time.sleep(0.05)
+    assert "Be extra brief." in pc.get("dob")
+
+
+def test_reload_detects_same_mtime_change(tmp_path):
+    path = tmp_path / "prompt.txt"
+    path.write_text("Rules v1", encoding="utf-8")
+    pc = PromptCompiler(str(path), reload_interval=0)
+    st = os.stat(path)
+    path.write_text("Rules version 2", encoding="utf-8")
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert pc.reload() is True
+    assert pc.get(FULL) == "Rules version 2"
+
+
+def test_unknown_state_uses_full_prompt(tmp_path):
+    path = tmp_path / "prompt.txt"
+    path.write_text(_shipped_prompt(), encoding="utf-8")
+    pc = PromptCompiler(str(path), reload_interval=0)
+    assert pc.get("nope") == pc.get(FULL) == _shipped_prompt().strip()
+    assert pc.get(None) == pc.get(FULL)
@@ -20,6 +20,7 @@ except Exception:
     NumberParseException = Exception
 
 from .twilio_response import ssml_digits
+from .phrases import YES_WORDS, NO_WORDS
 
 
 # --------------------------- вспомогательные функции ---------------------------
@@ -139,11 +140,11 @@ class MedDialog:
             if "candidate_name" in s.attempts:
                 candidate = s.attempts["candidate_name"]
                 t = txt.lower()
-                if any(w in t for w in ["yes", "correct", "confirm", "yeah", "right", "ok", "okay", "sure"]):
+                if any(w in t for w in YES_WORDS):
                     s.full_name = candidate
                     s.attempts.pop("candidate_name")
                     return f"Great, {s.full_name}. What is the reason for your visit?", False, False
-                elif any(w in t for w in ["no", "wrong", "not"]):
+                elif any(w in t for w in NO_WORDS):
                     s.attempts.pop("candidate_name")
                     return "Okay, let's try again. Please tell me your full name.", False, False
                 else:
@@ -177,11 +178,11 @@ class MedDialog:
             if "candidate_dob" in s.attempts:
                 candidate_dob = s.attempts["candidate_dob"]
                 t = txt.lower()
-                if any(w in t for w in ["yes", "correct", "confirm", "yeah", "right", "ok", "okay", "sure"]):
+                if any(w in t for w in YES_WORDS):
                     s.dob = candidate_dob
                     s.attempts.pop("candidate_dob")
                     return f"Date of birth {s.dob.strftime('%d %B %Y')} confirmed. Please provide your phone number.", False, False
-                elif any(w in t for w in ["no", "wrong", "not"]):
+                elif any(w in t for w in NO_WORDS):
                     s.attempts.pop("candidate_dob")
                     return "Okay, please repeat your date of birth, for example: May 15 1980.", False, False
                 else:
@@ -200,12 +201,12 @@ class MedDialog:
             if "candidate_phone" in s.attempts:
                 candidate_e164, candidate_ssml = s.attempts["candidate_phone"]
                 t = txt.lower()
-                if any(w in t for w in ["yes", "correct", "confirm", "yeah", "right", "ok", "okay", "sure"]):
+                if any(w in t for w in YES_WORDS):
                     s.phone_e164 = candidate_e164
                     s.phone_ssml = candidate_ssml
                     s.attempts.pop("candidate_phone")
                     return f"Phone number confirmed. Let me summarize all details.", False, False
-                elif any(w in t for w in ["no", "wrong", "not"]):
+                elif any(w in t for w in NO_WORDS):
                     s.attempts.pop("candidate_phone")
                     return "Okay, please repeat your phone number digit by digit.", False, False
                 else:
@@ -0,0 +1,4 @@
+# utils/phrases.py
+# Слова подтверждения/отказа пациента (общие для MedDialog и PromptCompiler)
+YES_WORDS = ("yes", "correct", "confirm", "yeah", "right", "ok", "okay", "sure")
+NO_WORDS = ("no", "wrong", "not")
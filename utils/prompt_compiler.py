@@ -0,0 +1,266 @@
+# utils/prompt_compiler.py
+"""
+Компилятор системного промпта по состояниям диалога.
+
+Файл промпта разбирается на секции (### ...) один раз при старте.
+Для каждого шага из "Conversation Flow" заранее собирается минимальный
+промпт: шапка + общие секции (General Rules, Error Handling) + текущий
+шаг и все оставшиеся после него (пройденные шаги выбрасываются).
+Готовые строки лежат в неизменяемом снимке, который атомарно
+подменяется фоновым потоком при изменении файла — на пути запроса
+к диску мы не ходим.
+"""
+from __future__ import annotations
+import os, re, sys, threading, time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Optional, List, Dict, Mapping, Tuple
+
+from .phrases import YES_WORDS, NO_WORDS
+
+# Точный подсчёт токенов, если есть tiktoken; иначе оценка ~4 символа/токен
+try:
+    import tiktoken
+    _enc = tiktoken.get_encoding("o200k_base")
+except Exception:
+    tiktoken = None
+    _enc = None
+
+# Без tiktoken "токены" — лишь оценка; так и помечаем в отчёте
+TOKENS_ESTIMATED = _enc is None
+
+FULL = "full"
+
+# Шаги, которые ожидаются в файле промпта. Реальный порядок берётся из
+# "Conversation Flow" при каждой компиляции. Приветствие произносит TwiML.
+EXPECTED_STATES: Tuple[str, ...] = ("name", "reason", "when", "dob", "phone", "confirm")
+
+# Заголовок шага в файле промпта → состояние. Проверяется по порядку,
+# первое совпавшее слово побеждает ("Date of Birth" → dob, а не when).
+# None — шаг не компилируется.
+STEP_TITLES: Tuple[Tuple[str, Optional[str]], ...] = (
+    ("greeting", None),
+    ("birth", "dob"),
+    ("name", "name"),
+    ("reason", "reason"),
+    ("date", "when"),
+    ("time", "when"),
+    ("phone", "phone"),
+    ("confirm", "confirm"),
+)
+
+_SECTION_RE = re.compile(r"^###\s*(.+?)\s*:?\s*$", re.MULTILINE)
+_STEP_RE = re.compile(r"^\s*\d+\.\s*\*\*(.+?)\*\*\s*$", re.MULTILINE)
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    if _enc is not None:
+        return len(_enc.encode(text))
+    return (len(text) + 3) // 4
+
+
+def _slug(title: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", title.lower()).strip("_") or "step"
+
+
+def step_state(title: str) -> Optional[str]:
+    """Состояние для заголовка шага; неизвестные шаги получают slug заголовка."""
+    t = title.lower()
+    for word, state in STEP_TITLES:
+        if word in t:
+            return state
+    return _slug(title)
+
+
+def _split_sections(text: str) -> Tuple[str, List[Tuple[str, str]]]:
+    """Возвращает (шапка до первого ###, [(заголовок, блок целиком), ...])."""
+    matches = list(_SECTION_RE.finditer(text))
+    if not matches:
+        return text.strip(), []
+    head = text[:matches[0].start()].strip()
+    sections = []
+    for i, m in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        sections.append((m.group(1).strip(), text[m.start():end].strip()))
+    return head, sections
+
+
+def _split_steps(block: str) -> List[Tuple[str, str]]:
+    """Разбивает секцию Conversation Flow на [(название шага, текст шага), ...]."""
+    matches = list(_STEP_RE.finditer(block))
+    steps = []
+    for i, m in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(block)
+        steps.append((m.group(1).strip(), block[m.start():end].strip()))
+    return steps
+
+
+@dataclass(frozen=True)
+class CompiledPrompts:
+    prompts: Mapping[str, str]
+    tokens: Mapping[str, int]
+    order: Tuple[str, ...] = ()  # шаги в порядке "Conversation Flow"
+    signature: Optional[Tuple[int, int]] = None  # (st_mtime_ns, st_size) файла
+
+    def savings(self) -> Dict[str, Dict[str, float]]:
+        """Экономия входных токенов по состояниям относительно полного промпта."""
+        full = self.tokens.get(FULL, 0)
+        out = {}
+        for state, n in self.tokens.items():
+            if state == FULL:
+                continue
+            saved = full - n
+            out[state] = {
+                "tokens": n,
+                "saved": saved,
+                "saved_pct": round(100.0 * saved / full, 1) if full else 0.0,
+            }
+        return out
+
+
+def compile_prompt(text: str, signature: Optional[Tuple[int, int]] = None) -> CompiledPrompts:
+    text = (text or "").strip()
+    head, sections = _split_sections(text)
+
+    flow_idx = next((i for i, (t, _) in enumerate(sections) if "flow" in t.lower()), None)
+    steps = _split_steps(sections[flow_idx][1]) if flow_idx is not None else []
+
+    # [(состояние, текст шага)] без приветствия и повторов
+    flow: List[Tuple[str, str]] = []
+    for title, body in steps:
+        state = step_state(title)
+        if not state:
+            continue
+        if any(state == s for s, _ in flow):
+            print(f"[prompt] WARNING: step '{title}' duplicates state '{state}' — skipped", file=sys.stderr)
+            continue
+        flow.append((state, body))
+
+    prompts: Dict[str, str] = {FULL: text}
+    if flow:
+        before = [b for _, b in sections[:flow_idx]]
+        after = [b for _, b in sections[flow_idx + 1:]]
+        for i, (state, body) in enumerate(flow):
+            # Шаг в модели может отставать от разговора (GPT идёт дальше без
+            # подтверждения), поэтому оставшиеся шаги передаём целиком.
+            current = f"### Current Step:\n{body}"
+            rest = [b for _, b in flow[i + 1:]]
+            if rest:
+                current += "\n\n### Remaining Steps (continue with these in order):\n" + "\n\n".join(rest)
+            parts = [p for p in [head, *before, current, *after] if p]
+            prompts[state] = "\n\n".join(parts)
+
+    if text:
+        missing = [s for s in EXPECTED_STATES if s not in prompts]
+        if missing:
+            print(f"[prompt] WARNING: no step for {', '.join(missing)} — full prompt will be used", file=sys.stderr)
+
+    tokens = {state: count_tokens(p) for state, p in prompts.items()}
+    order = tuple(s for s, _ in flow)
+    return CompiledPrompts(MappingProxyType(prompts), MappingProxyType(tokens), order, signature)
+
+
+@dataclass
+class CallStep:
+    """
+    Текущий шаг звонка. Первая реплика пациента на шаге — ответ,
+    следующая с "yes"/"correct" и без "no" — подтверждение, после
+    которого переходим к следующему шагу из order. Ответы GPT не
+    анализируются; шаг может только отставать от разговора, а промпт
+    шага содержит все оставшиеся шаги.
+    """
+    state: Optional[str] = None
+    answered: bool = False
+
+    def advance(self, user_text: str, order: Tuple[str, ...]) -> str:
+        if not order:
+            return FULL
+        if self.state is None:
+            self.state = order[0]
+        if self.state not in order:
+            # шаг пропал из файла после hot reload — отдаём полный промпт
+            return FULL
+        words = set(re.findall(r"[a-z]+", (user_text or "").lower()))
+        confirmed = self.answered and bool(words & set(YES_WORDS)) and not (words & set(NO_WORDS))
+        if confirmed:
+            idx = order.index(self.state)
+            if idx + 1 < len(order):
+                self.state = order[idx + 1]
+                self.answered = False
+                return self.state
+        self.answered = True
+        return self.state
+
+
+class PromptCompiler:
+    """Держит скомпилированный снимок и перечитывает файл при изменении (mtime_ns, size)."""
+
+    def __init__(self, path: str, reload_interval: float = 2.0, autoload: bool = True):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._compiled = compile_prompt("")
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        if autoload:
+            self.reload(force=True)
+
+    @property
+    def compiled(self) -> CompiledPrompts:
+        return self._compiled
+
+    def get(self, state: Optional[str]) -> str:
+        """Путь запроса: только чтение из памяти, без обращения к диску."""
+        c = self._compiled
+        return c.prompts.get(state or FULL) or c.prompts.get(FULL, "")
+
+    def _signature(self) -> Tuple[int, int]:
+        st = os.stat(self.path)
+        return st.st_mtime_ns, st.st_size
+
+    def reload(self, force: bool = False) -> bool:
+        with self._lock:
+            try:
+                sig = self._signature()
+            except OSError:
+                if force:
+                    print("[prompt] system prompt not found ❌")
+                return False
+            if not force and sig == self._compiled.signature:
+                return False
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    text = f.read()
+                # файл менялся во время чтения — дочитаем на следующем тике
+                if self._signature() != sig:
+                    return False
+            except Exception as e:
+                print(f"[prompt] read error: {e}", file=sys.stderr)
+                return False
+            self._compiled = compile_prompt(text, sig)
+        print("[prompt] system prompt compiled ✅")
+        self.report()
+        return True
+
+    def report(self) -> None:
+        c = self._compiled
+        unit = "tokens (estimated, chars/4)" if TOKENS_ESTIMATED else "tokens"
+        print(f"[prompt] full: {c.tokens.get(FULL, 0)} {unit}")
+        for state, s in c.savings().items():
+            print(f"[prompt] {state}: {s['tokens']} {unit} (-{s['saved']}, -{s['saved_pct']}%)")
+
+    def start_watcher(self) -> None:
+        if self._thread or self.reload_interval <= 0:
+            return
+
+        def _watch():
+            while True:
+                time.sleep(self.reload_interval)
+                try:
+                    self.reload()
+                except Exception as e:
+                    print(f"[prompt] reload error: {e}", file=sys.stderr)
+
+        self._thread = threading.Thread(target=_watch, name="prompt-watcher", daemon=True)
+        self._thread.start()